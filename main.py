@@ -5,115 +5,825 @@
 
 import os
 import io
+import sys
+import errno
+import hashlib
+import ctypes
 import json
+import struct
 import shutil
+import sqlite3
+import atexit
+import queue
+import argparse
+import itertools
+import threading
+import multiprocessing
 import subprocess
 import concurrent.futures
-from tqdm import tqdm
 import datetime
 import time
 
-def exiftool_get_metadata(file_path):
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+
+PHOTO_EXTS = frozenset({'.jpg', '.jpeg', '.cr2', '.nef', '.arw', '.dng', '.cr3', '.raf', '.gpr'})
+VIDEO_EXTS = frozenset({'.mp4', '.mov', '.avi', '.mkv'})
+MEDIA_EXTS = PHOTO_EXTS | VIDEO_EXTS
+
+def default_exiftool():
     """
-    Uses ExifTool to extract Model and DateTimeOriginal in JSON format.
-    Returns a dict with keys 'model' (str) and 'datetime_original' (datetime) if found, else None.
+    Returns the ExifTool command to run: on Windows the exiftool.exe shipped
+    next to this script if present (so it's found whatever the working
+    directory is), otherwise "exiftool" from the PATH.
     """
-    try:
-        # Only request the tags we need, for speed
-        cmd = ["exiftool", "-j", "-n", "-Model", "-DateTimeOriginal", file_path]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            # ExifTool error
+    if sys.platform == "win32":
+        bundled = os.path.join(os.path.dirname(os.path.abspath(__file__)), "exiftool.exe")
+        if os.path.exists(bundled):
+            return bundled
+    return "exiftool"
+
+class ExifToolDaemon:
+    """
+    Keeps one ExifTool process running in "-stay_open" mode, so the Perl
+    start-up cost is paid once per run instead of once per file.
+    Requests are serialised with a lock, so the daemon can be shared by threads.
+    """
+    READY = "{ready}"
+
+    def __init__(self, executable=None):
+        self.executable = executable or default_exiftool()
+        self.process = None
+        self.lock = threading.Lock()
+
+    def _start(self):
+        if self.process is None or self.process.poll() is not None:
+            cmd = [self.executable, "-stay_open", "True", "-@", "-",
+                   "-common_args", "-charset", "filename=utf8", "-j", "-n"]
+            self.process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding="utf-8",
+            )
+
+    def execute(self, args):
+        """
+        Sends one batch of arguments followed by "-execute" and returns
+        everything ExifTool printed before its "{ready}" sentinel.
+        """
+        with self.lock:
+            self._start()
+            self.process.stdin.write("\n".join(args) + "\n-execute\n")
+            self.process.stdin.flush()
+            lines = []
+            while True:
+                line = self.process.stdout.readline()
+                if not line:
+                    # ExifTool died; a new one is started on the next request
+                    self.process = None
+                    raise RuntimeError("ExifTool exited unexpectedly")
+                if line.strip() == self.READY:
+                    break
+                lines.append(line)
+            return "".join(lines)
+
+    def get(self, file_path, tags, options=()):
+        """
+        Returns the JSON dict ExifTool reports for file_path, restricted to tags,
+        or None if ExifTool could not read the file.
+        options are extra ExifTool flags for this request only (e.g. "-fast2").
+        """
+        output = self.execute(list(options) + [f"-{tag}" for tag in tags] + [file_path])
+        if not output.strip():
             return None
+        data = json.loads(output)
+        return data[0] if data else None
+
+    def close(self):
+        with self.lock:
+            if self.process is None or self.process.poll() is not None:
+                self.process = None
+                return
+            try:
+                self.process.stdin.write("-stay_open\nFalse\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=5)
+            except Exception:
+                self.process.kill()
+            self.process = None
+
+class ExifToolPool:
+    """
+    Hands out up to size ExifToolDaemon processes, started on demand, so that
+    several threads can query ExifTool at the same time instead of queueing
+    on a single process. Same execute/get/close interface as ExifToolDaemon.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.daemons = []
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if len(self.daemons) < self.size:
+                daemon = ExifToolDaemon()
+                self.daemons.append(daemon)
+                return daemon
+        return self.idle.get()
+
+    def execute(self, args):
+        daemon = self._acquire()
+        try:
+            return daemon.execute(args)
+        finally:
+            self.idle.put(daemon)
+
+    def get(self, file_path, tags, options=()):
+        daemon = self._acquire()
+        try:
+            return daemon.get(file_path, tags, options)
+        finally:
+            self.idle.put(daemon)
 
-        data = json.loads(result.stdout)
-        if not data or len(data) == 0:
+    def close(self):
+        with self.lock:
+            for daemon in self.daemons:
+                daemon.close()
+
+EXIFTOOL = ExifToolPool(size=min(4, os.cpu_count() or 1))
+atexit.register(EXIFTOOL.close)
+
+def parse_exiftool_info(info):
+    """
+    Converts one ExifTool JSON record into the metadata dict used throughout:
+    keys 'model' (str) and 'datetime_original' (datetime or None).
+    """
+    camera_model = info.get("Model")
+    dt_original_str = info.get("DateTimeOriginal")
+
+    return {
+        "model": camera_model,
+        "datetime_original": parse_exif_datetime(dt_original_str)
+    }
+
+# Parsed EXIF date strings; burst shots share the same second-stamp
+_DATE_CACHE = {}
+
+def parse_exif_datetime(value):
+    """
+    Converts an EXIF date "YYYY:MM:DD HH:MM:SS" (or "YYYY-MM-DD HH:MM:SS") to a
+    datetime, or returns None if value is empty or not a valid date.
+    """
+    if not value:
+        return None
+    value = str(value)
+    if value in _DATE_CACHE:
+        return _DATE_CACHE[value]
+    dt = None
+    try:
+        # The format is fixed-width, so slicing is much cheaper than strptime
+        dt = datetime.datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                               int(value[11:13]), int(value[14:16]), int(value[17:19]))
+    except (ValueError, IndexError):
+        for fmt in ["%Y:%m:%d %H:%M:%S", "%Y-%m-%d %H:%M:%S"]:
+            try:
+                dt = datetime.datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                pass
+    _DATE_CACHE[value] = dt
+    return dt
+
+# Metadata already extracted this run, keyed by (path, size, mtime) so an
+# edited or replaced file is read again. Unreadable files are cached as None.
+_META_CACHE = {}
+
+def _meta_cache_key(file_path, st=None):
+    """
+    Returns the _META_CACHE key for file_path, or None if it can't be stat'ed.
+    Pass st (e.g. a DirEntry's cached stat) to avoid another stat call.
+    """
+    if st is None:
+        try:
+            st = os.stat(file_path)
+        except OSError:
             return None
+    return (file_path, st.st_size, st.st_mtime)
 
-        info = data[0]
-        camera_model = info.get("Model")
-        dt_original_str = info.get("DateTimeOriginal")
+# Cache file used to keep _META_CACHE between runs
+META_CACHE_PATH = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "camera-file-sorting",
+    "meta.sqlite",
+)
+# Keys read from META_CACHE_PATH, so save_cache() only writes new results
+_META_CACHE_LOADED = set()
 
-        # Convert "YYYY:MM:DD HH:MM:SS" -> datetime
-        dt_original = None
-        if dt_original_str:
-            for fmt in ["%Y:%m:%d %H:%M:%S", "%Y-%m-%d %H:%M:%S"]:
-                try:
-                    dt_original = datetime.datetime.strptime(dt_original_str, fmt)
-                    break
-                except ValueError:
-                    pass
+def _open_cache_db(cache_path):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    db = sqlite3.connect(cache_path)
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS meta ("
+        " path TEXT, size INTEGER, mtime REAL,"
+        " readable INTEGER, model TEXT, dt_iso TEXT,"
+        " PRIMARY KEY (path, size, mtime))"
+    )
+    return db
 
-        return {
-            "model": camera_model,
-            "datetime_original": dt_original
-        }
+def _path_range(folder):
+    """
+    Returns (low, high) such that exactly the paths under folder sort in
+    low <= path < high (SQLite compares TEXT byte by byte), so a range
+    query on the primary key finds them.
+    """
+    prefix = os.path.join(folder, "")
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
 
+def load_cache(source_folder, cache_path=META_CACHE_PATH):
+    """
+    Fills _META_CACHE with the metadata saved by earlier runs for files
+    under source_folder, so files that have not changed since are not read
+    again. Rows for other folders and cards are left in the database.
+    """
+    if not os.path.exists(cache_path):
+        return
+    try:
+        db = _open_cache_db(cache_path)
+        try:
+            rows = db.execute(
+                "SELECT path, size, mtime, readable, model, dt_iso FROM meta"
+                " WHERE path >= ? AND path < ?", _path_range(source_folder)
+            ).fetchall()
+        finally:
+            db.close()
+    except sqlite3.Error as e:
+        print(f"Warning: could not read the metadata cache {cache_path}: {e}")
+        return
+    for path, size, mtime, readable, model, dt_iso in rows:
+        key = (path, size, mtime)
+        if readable:
+            dt = datetime.datetime.fromisoformat(dt_iso) if dt_iso else None
+            _META_CACHE[key] = {"model": model, "datetime_original": dt}
+        else:
+            _META_CACHE[key] = None
+        _META_CACHE_LOADED.add(key)
+
+def save_cache(source_folder, live_paths, cache_path=META_CACHE_PATH):
+    """
+    Writes the metadata extracted this run to cache_path, in one transaction.
+    Older entries for a file that has since changed are dropped, and so are
+    the entries under source_folder for files that are gone (any path not in
+    live_paths, the photos found by this run's walk).
+    """
+    rows = []
+    for key, meta in list(_META_CACHE.items()):
+        if key in _META_CACHE_LOADED:
+            continue
+        path, size, mtime = key
+        if meta is None:
+            rows.append((path, size, mtime, 0, None, None))
+        else:
+            dt = meta["datetime_original"]
+            rows.append((path, size, mtime, 1, meta["model"], dt.isoformat() if dt else None))
+    stale = {path for path, _, _ in _META_CACHE_LOADED if path not in live_paths}
+    if not rows and not stale:
+        return
+    try:
+        db = _open_cache_db(cache_path)
+        try:
+            with db:
+                db.executemany("DELETE FROM meta WHERE path = ?", [(path,) for path in stale])
+                db.executemany("DELETE FROM meta WHERE path = ?", [(row[0],) for row in rows])
+                db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            db.close()
+    except sqlite3.Error as e:
+        print(f"Warning: could not write the metadata cache {cache_path}: {e}")
+        return
+    _META_CACHE_LOADED.difference_update(key for key in list(_META_CACHE_LOADED) if key[0] in stale)
+    _META_CACHE_LOADED.update(row[:3] for row in rows)
+
+def exiftool_get_metadata(file_path, fast=False):
+    """
+    Uses the shared ExifTool daemon to extract Model and DateTimeOriginal.
+    Returns a dict with keys 'model' (str) and 'datetime_original' (datetime) if found, else None.
+    Results are cached, so asking twice for the same file only runs ExifTool once.
+    fast=True adds "-fast2": ExifTool stops after the header instead of scanning
+    for trailers. Both tags sit in the EXIF header of photos, but video tags
+    can live elsewhere, so only use it for photo files.
+    """
+    key = _meta_cache_key(file_path)
+    if key in _META_CACHE:
+        return _META_CACHE[key]
+
+    try:
+        # Only request the tags we need, for speed
+        options = ["-fast2"] if fast else []
+        info = EXIFTOOL.get(file_path, ["Model", "DateTimeOriginal"], options)
+        meta = parse_exiftool_info(info) if info else None
     except Exception as e:
         print(f"Error extracting metadata from {file_path}: {e}")
         return None
 
+    if key is not None:
+        _META_CACHE[key] = meta
+    return meta
+
+def exiftool_get_metadata_batch(file_paths, batch_size=500, fast=True, stat_results=None):
+    """
+    Extracts Model and DateTimeOriginal for many files with one ExifTool
+    request per batch_size files, instead of one request per file.
+    Returns a dict mapping each readable path to its metadata dict.
+    fast works as in exiftool_get_metadata; it defaults to True because
+    the batch is used for photo files.
+    stat_results optionally maps paths to stat results already known.
+    """
+    stat_results = stat_results or {}
+    metadata = {}
+    keys = {}
+    to_read = []
+    for path in file_paths:
+        key = _meta_cache_key(path, stat_results.get(path))
+        if key in _META_CACHE:
+            if _META_CACHE[key] is not None:
+                metadata[path] = _META_CACHE[key]
+        else:
+            keys[path] = key
+            to_read.append(path)
+
+    for i in range(0, len(to_read), batch_size):
+        batch = to_read[i:i + batch_size]
+        # ExifTool echoes paths back in SourceFile, possibly with different separators
+        by_norm_path = {os.path.normpath(path): path for path in batch}
+        try:
+            options = ["-fast2"] if fast else []
+            output = EXIFTOOL.execute(options + ["-Model", "-DateTimeOriginal"] + batch)
+            records = json.loads(output) if output.strip() else []
+        except Exception as e:
+            print(f"Error extracting metadata from a batch of {len(batch)} files: {e}")
+            continue
+        for info in records:
+            path = by_norm_path.get(os.path.normpath(info.get("SourceFile", "")))
+            if path is not None:
+                metadata[path] = parse_exiftool_info(info)
+        for path in batch:
+            if keys[path] is not None:
+                _META_CACHE[keys[path]] = metadata.get(path)
+    return metadata
+
+# TIFF tag IDs read by the native EXIF reader
+_TAG_MODEL = 0x0110
+_TAG_EXIF_IFD = 0x8769
+_TAG_DATETIME_ORIGINAL = 0x9003
+_NATIVE_READ_SIZE = 128 * 1024
+
+def _find_jpeg_tiff_offset(data, pos):
+    """
+    Walks the JPEG markers starting at pos (the SOI marker) and returns the
+    offset of the TIFF header inside the APP1 "Exif" segment, or None.
+    """
+    pos += 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # Fill byte
+            pos += 1
+            continue
+        if marker == 0xDA:
+            # Start of scan: no more metadata segments
+            return None
+        (seg_len,) = struct.unpack_from(">H", data, pos + 2)
+        if marker == 0xE1 and data[pos + 4:pos + 10] == b"Exif\x00\x00":
+            return pos + 10
+        pos += 2 + seg_len
+    return None
+
+def _read_tiff_tags(data, tiff, wanted):
+    """
+    Reads the ASCII tags in wanted from IFD0 and the EXIF sub-IFD of the TIFF
+    structure starting at offset tiff. Returns a dict of tag ID -> str as soon
+    as every wanted tag has been found.
+    Raises struct.error/ValueError if the structure runs outside data.
+    """
+    byte_order = data[tiff:tiff + 2]
+    if byte_order == b"II":
+        e = "<"
+    elif byte_order == b"MM":
+        e = ">"
+    else:
+        raise ValueError("not a TIFF header")
+
+    found = {}
+    (ifd,) = struct.unpack_from(e + "I", data, tiff + 4)
+    ifds = [ifd]
+    seen = set()
+    while ifds:
+        ifd = ifds.pop()
+        if ifd in seen:
+            continue
+        seen.add(ifd)
+        ifd_pos = tiff + ifd
+        (count,) = struct.unpack_from(e + "H", data, ifd_pos)
+        for i in range(count):
+            tag, typ, n, value = struct.unpack_from(e + "HHII", data, ifd_pos + 2 + 12 * i)
+            if tag == _TAG_EXIF_IFD:
+                ifds.append(value)
+            elif tag in wanted and typ == 2:
+                # ASCII: stored inline when it fits in 4 bytes
+                start = ifd_pos + 2 + 12 * i + 8 if n <= 4 else tiff + value
+                if start + n > len(data):
+                    raise ValueError("tag value outside the read buffer")
+                found[tag] = data[start:start + n].split(b"\x00", 1)[0].decode("ascii", "replace").strip()
+                if len(found) == len(wanted):
+                    # Everything asked for is here; skip the rest of the IFDs
+                    return found
+    return found
+
+def _native_exif(file_path):
+    """
+    Reads Model and DateTimeOriginal straight from the file header, without
+    starting ExifTool. Handles JPEG, TIFF-based RAWs (CR2, NEF, ARW, DNG, GPR)
+    and the JPEG preview inside RAF files.
+    Returns the same dict as exiftool_get_metadata, or None if the file could
+    not be parsed or has no camera model (callers then fall back to ExifTool).
+    """
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read(_NATIVE_READ_SIZE)
+
+        if data[:16] == b"FUJIFILMCCD-RAW ":
+            # RAF: the EXIF lives in the embedded JPEG preview
+            (jpeg,) = struct.unpack_from(">I", data, 84)
+            if data[jpeg:jpeg + 2] != b"\xff\xd8":
+                return None
+            tiff = _find_jpeg_tiff_offset(data, jpeg)
+        elif data[:2] == b"\xff\xd8":
+            tiff = _find_jpeg_tiff_offset(data, 0)
+        elif data[:4] in (b"II*\x00", b"MM\x00*"):
+            tiff = 0
+        else:
+            return None
+        if tiff is None:
+            return None
+
+        tags = _read_tiff_tags(data, tiff, {_TAG_MODEL, _TAG_DATETIME_ORIGINAL})
+    except (OSError, struct.error, ValueError):
+        return None
+
+    if not tags.get(_TAG_MODEL):
+        return None
+    return parse_exiftool_info({
+        "Model": tags[_TAG_MODEL],
+        "DateTimeOriginal": tags.get(_TAG_DATETIME_ORIGINAL),
+    })
+
+def get_photo_metadata(file_path):
+    """
+    Returns the metadata dict for a photo file, trying the native header
+    reader first and ExifTool only when that fails.
+    """
+    key = _meta_cache_key(file_path)
+    if key in _META_CACHE:
+        return _META_CACHE[key]
+    meta = _native_exif(file_path)
+    if meta is None:
+        return exiftool_get_metadata(file_path, fast=True)
+    if key is not None:
+        _META_CACHE[key] = meta
+    return meta
+
+def get_photo_metadata_batch(file_paths, stat_results=None, native_pool=None):
+    """
+    Like get_photo_metadata for many files: the native reader handles what it
+    can and the rest goes to ExifTool in batches.
+    Returns a dict mapping each readable path to its metadata dict.
+    stat_results optionally maps paths to stat results already known.
+    native_pool is an optional ProcessPoolExecutor to run the native reader
+    in, so parsing the headers isn't held back by the GIL; the cache is
+    still only touched in this process.
+    """
+    stat_results = stat_results or {}
+    metadata = {}
+    fallback = []
+    misses = []
+    for path in file_paths:
+        key = _meta_cache_key(path, stat_results.get(path))
+        if key in _META_CACHE:
+            if _META_CACHE[key] is not None:
+                metadata[path] = _META_CACHE[key]
+            continue
+        misses.append((path, key))
+    miss_paths = [path for path, _ in misses]
+    if native_pool is None:
+        results = map(_native_exif, miss_paths)
+    else:
+        results = native_pool.map(_native_exif, miss_paths, chunksize=64)
+    for (path, key), meta in zip(misses, results):
+        if meta is None:
+            fallback.append(path)
+            continue
+        if key is not None:
+            _META_CACHE[key] = meta
+        metadata[path] = meta
+    if fallback:
+        metadata.update(exiftool_get_metadata_batch(fallback, stat_results=stat_results))
+    return metadata
+
 def extract_camera_model(file_path):
     """
-    Returns the camera model if found, otherwise None.
+    Returns the camera model of a photo file if found, otherwise None.
     """
-    meta = exiftool_get_metadata(file_path)
+    meta = get_photo_metadata(file_path)
     if meta and meta["model"]:
         return meta["model"].strip()
     return None
 
-def get_file_date(file_path, ext, photo_extensions):
+def get_file_date(file_path, ext, metadata=None, mtime=None):
     """
     Returns a datetime object for the file:
-      1) DateTimeOriginal from ExifTool if available
+      1) DateTimeOriginal from the photo's metadata if available
       2) Otherwise, file modification time
+    If metadata (from get_photo_metadata_batch) is given, it is used
+    instead of reading the file again. If mtime is given (e.g. from a
+    DirEntry's cached stat), the file is not stat'ed again.
     """
-    if ext in photo_extensions:
-        meta = exiftool_get_metadata(file_path)
+    if ext in PHOTO_EXTS:
+        if metadata is not None:
+            meta = metadata.get(file_path)
+        else:
+            meta = get_photo_metadata(file_path)
         if meta and meta["datetime_original"]:
             return meta["datetime_original"]
     # Fallback: file modification time
-    mod_time = os.path.getmtime(file_path)
-    return datetime.datetime.fromtimestamp(mod_time)
+    if mtime is None:
+        mtime = os.path.getmtime(file_path)
+    return datetime.datetime.fromtimestamp(mtime)
 
-def create_directory(path):
-    if not os.path.exists(path):
-        os.makedirs(path)
+def get_extension(file_name):
+    """
+    Returns the lower-cased extension of file_name including the dot
+    (e.g. '.jpg'), or '' if it has none. Same result as
+    os.path.splitext(file_name)[1].lower() with a single scan of the name.
+    """
+    dot = file_name.rfind('.')
+    return file_name[dot:].lower() if dot > 0 else ''
 
-def secure_copy(source_file_path, target_file_path):
+def _list_folder(folder):
     """
-    Copy the file, preserving metadata, and verify size matches.
+    Returns (files, subfolders) for one folder: the DirEntry of each file
+    whose name doesn't start with '.' or '_', and the paths of its subfolders.
+    Hidden folders such as .Trashes or .Spotlight-V100 are skipped as well,
+    so their contents are never listed.
+    Symlinks are skipped, whether they point to a file or a folder: the type
+    then comes from the directory listing alone, with no stat per entry on
+    most filesystems.
     """
     try:
-        shutil.copy2(source_file_path, target_file_path)
-        if os.path.getsize(source_file_path) == os.path.getsize(target_file_path):
-            return True
+        with os.scandir(folder) as it:
+            entries = list(it)
+    except OSError as e:
+        print(f"Error reading folder {folder}: {e}")
+        return [], []
+
+    files = []
+    subfolders = []
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name[0] != ".":
+                subfolders.append(entry.path)
+        elif entry.is_file(follow_symlinks=False):
+            if entry.name[0] in "._":
+                continue
+            files.append(entry)
+    return files, subfolders
+
+def scan_files(folder):
+    """
+    Yields the DirEntry of every file under folder, in the same order as
+    os.walk (a folder's files before its subfolders), skipping file names
+    that start with '.' or '_' and hidden folders. One os.scandir per folder
+    gives the file types without extra stat calls, entry.path is the full
+    path, and entry.stat() caches its result.
+    Uses an explicit stack, so deep trees don't chain a generator per level.
+    """
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        files, subfolders = _list_folder(current)
+        yield from files
+        # Reversed so the first subfolder is walked next, as os.walk does
+        stack.extend(reversed(subfolders))
+
+def scan_files_parallel(folder, workers=8):
+    """
+    Same output and order as scan_files, but each top-level subfolder
+    (e.g. DCIM/100CANON, DCIM/101CANON...) is walked on its own thread.
+    Faster on SSDs and network storage; on a spinning disk the extra
+    seeking can make it slower, hence it's opt-in (--parallel-walk).
+    """
+    files, subfolders = _list_folder(folder)
+    yield from files
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        # map keeps subfolder order, so results match a sequential walk
+        for subtree in executor.map(lambda sub: list(scan_files(sub)), subfolders):
+            yield from subtree
+
+# Buffer for the userspace copy fallback; shutil's default (64 KiB, 1 MiB on Windows) is small for RAW/video files
+_COPY_BUFSIZE = 16 * 1024 * 1024
+# Errors meaning "this kernel/filesystem can't do that copy", not real I/O failures
+_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP}
+
+def _fadvise(fd, advice):
+    """
+    Passes an access-pattern hint for the whole file to the kernel.
+    """
+    try:
+        os.posix_fadvise(fd, 0, 0, advice)
+    except OSError:
+        # Only a hint; some filesystems (e.g. FUSE) reject it
+        pass
+
+def _copy_file_data(src, dst, size):
+    """
+    Copies size bytes from the open file src to the open file dst.
+    On Linux the data stays in the kernel (copy_file_range, then sendfile);
+    elsewhere it falls back to shutil.copyfileobj with a large buffer.
+    Returns the number of bytes copied.
+    """
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    copied = 0
+    if sys.platform.startswith("linux"):
+        # Read ahead aggressively; the source is read once, front to back
+        _fadvise(src_fd, os.POSIX_FADV_SEQUENTIAL)
+        kernel_copies = [lambda n: os.sendfile(dst_fd, src_fd, copied, n)]
+        # Missing from some Python builds (older glibc, other libcs)
+        copy_file_range = getattr(os, "copy_file_range", None)
+        if copy_file_range is not None:
+            kernel_copies.insert(0, lambda n: copy_file_range(src_fd, dst_fd, n))
+        for kernel_copy in kernel_copies:
+            try:
+                while copied < size:
+                    n = kernel_copy(size - copied)
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError as e:
+                # Only fall back if nothing was written yet
+                if copied or e.errno not in _COPY_UNSUPPORTED:
+                    raise
+                continue
+            if size and not copied:
+                # Some filesystems (e.g. FUSE, procfs) report 0 bytes instead of
+                # an error when they can't do it; treat that as unsupported
+                continue
+            # Don't let a card's worth of video push everything else
+            # out of the page cache
+            _fadvise(src_fd, os.POSIX_FADV_DONTNEED)
+            return copied
+    shutil.copyfileobj(src, dst, _COPY_BUFSIZE)
+    dst.flush()
+    return os.fstat(dst_fd).st_size
+
+# Linux ioctl that makes dst share src's data blocks (btrfs, XFS, ...)
+_FICLONE = 0x40049409
+_CLONE_UNSUPPORTED = _COPY_UNSUPPORTED | {errno.ENOTTY, errno.EBADF}
+_libc = None
+
+def _clone_fd(src, dst):
+    """
+    Linux: turns the open file dst into a copy-on-write clone of src.
+    Returns True on success, False if the filesystem can't clone.
+    """
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        return True
+    except OSError as e:
+        if e.errno in _CLONE_UNSUPPORTED:
+            return False
+        raise
+
+def _clonefile(source_file_path, target_file_path):
+    """
+    macOS: creates target_file_path as an APFS clone of source_file_path.
+    Returns True on success, False if it can't (other volume, file exists...).
+    """
+    global _libc
+    if sys.platform != "darwin":
+        return False
+    if _libc is None:
+        _libc = ctypes.CDLL(None, use_errno=True)
+    return _libc.clonefile(os.fsencode(source_file_path), os.fsencode(target_file_path), 0) == 0
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    """
+    Returns the BLAKE2b digest of the file's contents.
+    """
+    with open(file_path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            # Python 3.11+: reads and hashes without the GIL
+            return hashlib.file_digest(f, hashlib.blake2b).digest()
+        digest = hashlib.blake2b()
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+# Hashes the source side for files_match(), shared by all copy workers.
+# Threads are only started when needed; 32 covers any sensible --workers.
+_HASHER = concurrent.futures.ThreadPoolExecutor(max_workers=32)
+
+def files_match(source_file_path, target_file_path):
+    """
+    Returns True if both files have the same digest. The source (usually the
+    card) is hashed on a second thread while the copy is hashed here, so the
+    two devices are read at the same time.
+    """
+    source_digest = _HASHER.submit(file_digest, source_file_path)
+    return file_digest(target_file_path) == source_digest.result()
+
+def _copy_file_windows(source_file_path, target_file_path):
+    """
+    Windows: copies the file with CopyFileExW, which does the copy in kernel
+    mode (and server-side on SMB shares). Returns True on success, False if
+    not on Windows or the call failed (the caller then copies the data itself).
+    """
+    if sys.platform != "win32":
+        return False
+    copy_file = ctypes.windll.kernel32.CopyFileExW
+    copy_file.argtypes = [ctypes.c_wchar_p, ctypes.c_wchar_p,
+                          ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint32]
+    copy_file.restype = ctypes.c_int
+    return copy_file(source_file_path, target_file_path, None, None, None, 0) != 0
+
+def secure_copy(source_file_path, target_file_path, clone=True, verify=False):
+    """
+    Copy the file, preserving metadata, and check that every byte was copied.
+    With clone=True the copy is made as a copy-on-write clone when source
+    and target are on a filesystem that supports it, which is instant
+    whatever the file size; otherwise the data is copied (by the OS where
+    possible).
+    With verify=True both files are also hashed and compared afterwards.
+    """
+    try:
+        # Opening the target for writing would truncate the source itself
+        try:
+            same_file = os.path.samefile(source_file_path, target_file_path)
+        except OSError:
+            # Target doesn't exist yet
+            same_file = False
+        if same_file:
+            raise shutil.SameFileError(f"{source_file_path} and {target_file_path} are the same file")
+        if (clone and _clonefile(source_file_path, target_file_path)) or \
+                _copy_file_windows(source_file_path, target_file_path):
+            # The OS made the whole copy itself; there is no byte count to check
+            complete = True
         else:
+            with open(source_file_path, "rb") as src, open(target_file_path, "wb") as dst:
+                size = os.fstat(src.fileno()).st_size
+                if clone and _clone_fd(src, dst):
+                    copied = size
+                else:
+                    copied = _copy_file_data(src, dst, size)
+            complete = copied == size
+        shutil.copystat(source_file_path, target_file_path)
+        if not complete:
             print(f"Warning: Size mismatch for {os.path.basename(source_file_path)}")
             return False
+        if verify and not files_match(source_file_path, target_file_path):
+            print(f"Warning: Checksum mismatch for {os.path.basename(source_file_path)}")
+            return False
+        return True
     except Exception as e:
         print(f"Error copying {source_file_path} to {target_file_path}: {e}")
         return False
 
 def process_file(task):
     """
-    Copies one file to the correct folder (Photography or Videography).
+    Copies one file into target_folder, the <EXT> subfolder of the
+    photographer's Photography or Videography folder chosen by main().
+    The target folders must already exist; main() creates them up front.
     Returns (success_bool, file_name).
     """
-    root, file_name, photography_main, videography_main, photo_exts, video_exts = task
-    ext = os.path.splitext(file_name)[1].lower()
-    source_file_path = os.path.join(root, file_name)
-
-    if ext in photo_exts:
-        target_folder = os.path.join(photography_main, ext[1:].upper())
-    elif ext in video_exts:
-        target_folder = os.path.join(videography_main, ext[1:].upper())
-    else:
-        return (False, file_name)
-
-    create_directory(target_folder)
-    target_file_path = os.path.join(target_folder, file_name)
-    success = secure_copy(source_file_path, target_file_path)
+    source_file_path, file_name, target_folder, clone, verify = task
+    # target_folder comes from os.path.join and never ends in a separator
+    target_file_path = target_folder + os.sep + file_name
+    success = secure_copy(source_file_path, target_file_path, clone, verify)
     return (success, file_name)
 
 def parse_date_input(date_input):
@@ -138,38 +848,128 @@ def parse_date_input(date_input):
         print(f"Error parsing date input: {e}")
         return None, None
 
-def find_first_camera_model_in_parallel(photo_files):
+def find_first_camera_model(photo_files, metadata=None, sample_size=8):
     """
-    Scans photo_files in parallel, returning the first camera model found.
-    If none found, returns None.
-    Once a model is found, cancels remaining tasks for speed.
+    Returns the first camera model found in photo_files, or None.
+    Almost every source folder holds a single camera's files and the first
+    readable photo usually answers, so only the first sample_size files are
+    read. If metadata (from get_photo_metadata_batch) is given, it is
+    scanned in full instead, since that costs no extra reads.
     """
-    if not photo_files:
-        return None
-
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future_to_file = {
-            executor.submit(extract_camera_model, pf): pf
-            for pf in photo_files
-        }
-        for future in concurrent.futures.as_completed(future_to_file):
-            model = future.result()
+    if metadata is None:
+        for pf in photo_files[:sample_size]:
+            model = extract_camera_model(pf)
             if model:
-                # Found a model; stop scanning further
-                if hasattr(executor, 'shutdown'):
-                    # Python 3.9+ only
-                    executor.shutdown(cancel_futures=True)
                 return model
+        return None
+
+    for pf in photo_files:
+        meta = metadata.get(pf)
+        if meta and meta["model"]:
+            return meta["model"].strip()
     return None
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Sorts SD card photos and videos into an event folder using their metadata."
+    )
+    copy_mode = parser.add_mutually_exclusive_group()
+    copy_mode.add_argument("--clone", dest="clone", action="store_true", default=True,
+                           help="clone files (copy-on-write) when the filesystem supports it (default)")
+    copy_mode.add_argument("--copy", dest="clone", action="store_false",
+                           help="always copy the file data, never clone")
+    parser.add_argument("--verify", action="store_true",
+                        help="compare a checksum of every copied file with its source")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="don't read or save the metadata cache kept between runs")
+    parser.add_argument("--parallel-walk", action="store_true",
+                        help="scan each top-level source subfolder on its own thread (SSD/network storage)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of files copied at once (default: 8 threads, or min(8, CPU count) with --processes)")
+    parser.add_argument("--processes", action="store_true",
+                        help="copy, and parse photo headers for the date filter, in worker processes instead of threads")
+    args = parser.parse_args(argv)
+    if args.workers is None:
+        # Copy threads mostly wait on the disks, so the CPU count doesn't
+        # limit them; worker processes each need a core.
+        args.workers = min(8, os.cpu_count() or 1) if args.processes else 8
+    elif args.workers < 1:
+        parser.error("--workers must be at least 1")
+    return args
+
+def gather_source_files(source_folder, date_range=None, batch_size=100, parallel_walk=False,
+                        processes=False):
+    """
+    Walks source_folder once and returns
+      (source_files, photo_file_paths, photo_metadata, ignored_count)
+    where source_files lists (DirEntry, ext) for every photo and video.
+    Files that are neither are counted in ignored_count and left out.
+    If date_range is given (the caller filters on it), photo metadata is
+    read with get_photo_metadata_batch(photo_paths), one batch_size chunk at
+    a time, on background threads (one per ExifTool process in EXIFTOOL), so
+    the header reads run in parallel and overlap the directory reads still
+    to come. The DirEntry stats are handed over so the cache lookups
+    don't stat the files again. photo_metadata is None otherwise.
+    parallel_walk uses scan_files_parallel instead of scan_files.
+    processes parses the photo headers in worker processes, one per CPU.
+    """
+    source_files = []
+    photo_file_paths = []
+    ignored_count = 0
+    metadata_futures = []
+
+    native_pool = None
+    if date_range and processes:
+        # Its workers start from the metadata threads while the walk is still
+        # running; forking a multi-threaded process can deadlock, so spawn
+        native_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn")
+        )
+    with concurrent.futures.ThreadPoolExecutor(max_workers=EXIFTOOL.size) as metadata_reader:
+        pending = {}
+        walker = scan_files_parallel if parallel_walk else scan_files
+        for entry in walker(source_folder):
+            ext = get_extension(entry.name)
+            if ext not in MEDIA_EXTS:
+                ignored_count += 1
+                continue
+            source_files.append((entry, ext))
+            if ext in PHOTO_EXTS:
+                photo_file_paths.append(entry.path)
+                if date_range:
+                    try:
+                        pending[entry.path] = entry.stat()
+                    except OSError:
+                        pending[entry.path] = None
+                    if len(pending) >= batch_size:
+                        metadata_futures.append(metadata_reader.submit(
+                            get_photo_metadata_batch, list(pending), pending, native_pool
+                        ))
+                        pending = {}
+        if date_range and pending:
+            metadata_futures.append(metadata_reader.submit(
+                get_photo_metadata_batch, list(pending), pending, native_pool
+            ))
+
+    photo_metadata = None
+    if date_range:
+        photo_metadata = {}
+        for future in metadata_futures:
+            photo_metadata.update(future.result())
+    if native_pool is not None:
+        native_pool.shutdown()
+    return source_files, photo_file_paths, photo_metadata, ignored_count
+
+def main(argv=None):
+    args = parse_args(argv)
+
     source_folder = input("Enter the source folder path where your media files are located: ").strip()
+    source_folder = os.path.abspath(source_folder)
+    if not args.no_cache:
+        load_cache(source_folder)
     event_folder = input("Enter the destination event folder path (parent folder): ").strip()
     photographer_name = input("Enter your name: ").strip()
 
-    photo_extensions = {'.jpg', '.jpeg', '.cr2', '.nef', '.arw', '.dng', '.cr3', '.raf', '.gpr'}
-    video_extensions = {'.mp4', '.mov', '.avi', '.mkv'}
-
     date_input = input("Enter a date (DD/MM/YYYY) for one day or a range (DD/MM/YYYY - DD/MM/YYYY), or leave empty for all files: ").strip()
     use_date_filter = False
     start_date = end_date = None
@@ -180,20 +980,29 @@ def main():
         else:
             print("Continuing without date filtering due to input error.")
 
-    # 1) Gather photo files for camera-model scanning
-    print("Gathering photo files for camera-model detection...")
-    photo_file_paths = []
-    for root, dirs, files in os.walk(source_folder):
-        for file_name in files:
-            if file_name.startswith('.') or file_name.startswith('_'):
-                continue
-            ext = os.path.splitext(file_name)[1].lower()
-            if ext in photo_extensions:
-                photo_file_paths.append(os.path.join(root, file_name))
+    # 1) Walk the source folder once; photos are also kept for camera-model scanning.
+    #    The date filter needs every photo's metadata, which is read while the walk goes on.
+    if use_date_filter:
+        print("Scanning source folder and reading photo metadata...")
+        date_range = (start_date, end_date)
+    else:
+        print("Scanning source folder...")
+        date_range = None
+    source_files, photo_file_paths, photo_metadata, ignored_count = gather_source_files(
+        source_folder, date_range, parallel_walk=args.parallel_walk,
+        processes=args.processes
+    )
+    if ignored_count:
+        print(f"Ignoring {ignored_count} files that are not photos or videos.")
 
-    # 2) Find the first camera model in parallel
-    print("Scanning for the first camera model in photo files...")
-    camera_model = find_first_camera_model_in_parallel(photo_file_paths)
+    # 2) Find the camera model (from the metadata if it was read, else a few sampled photos)
+    if not use_date_filter:
+        print("Scanning for the first camera model in photo files...")
+    camera_model = find_first_camera_model(photo_file_paths, photo_metadata)
+    if not camera_model and photo_metadata is not None:
+        # Nothing usable in the batch results (e.g. an ExifTool batch failed):
+        # sample photos directly, as without a date filter
+        camera_model = find_first_camera_model(photo_file_paths)
     if not camera_model:
         # If we didn't find any, ask the user
         camera_model = input("No camera model found. Enter the camera model to tag video files: ").strip()
@@ -205,7 +1014,7 @@ def main():
 
     # Always create a Graphics folder
     graphics_folder = os.path.join(event_folder, "Graphics")
-    create_directory(graphics_folder)
+    os.makedirs(graphics_folder, exist_ok=True)
 
     # Prepare destination paths for photos & videos
     photography_main = os.path.join(event_folder, "Photography", folder_suffix)
@@ -213,36 +1022,52 @@ def main():
 
     # 3) Build the list of files to process (photo + video)
     print("Building file list for transfer...")
-    files_to_process = []
-    for root, dirs, files in os.walk(source_folder):
-        for file_name in files:
-            if file_name.startswith('.') or file_name.startswith('_'):
+    # Target folder for each extension, joined once instead of once per file
+    target_folders = {ext: os.path.join(photography_main, ext[1:].upper()) for ext in PHOTO_EXTS}
+    target_folders.update({ext: os.path.join(videography_main, ext[1:].upper()) for ext in VIDEO_EXTS})
+    photo_tasks = []
+    video_tasks = []
+    exts_found = set()
+    for entry, ext in source_files:
+        if use_date_filter:
+            # Photos without a usable DateTimeOriginal fall back to their mtime
+            # DirEntry caches its stat, so this doesn't hit the disk again
+            mtime = entry.stat().st_mtime
+            file_date = get_file_date(entry.path, ext, photo_metadata, mtime).date()
+            if not (start_date <= file_date <= end_date):
                 continue
-            ext = os.path.splitext(file_name)[1].lower()
-            file_path = os.path.join(root, file_name)
-
-            if use_date_filter:
-                file_date = get_file_date(file_path, ext, photo_extensions).date()
-                if not (start_date <= file_date <= end_date):
-                    continue
 
-            files_to_process.append(
-                (root, file_name, photography_main, videography_main, photo_extensions, video_extensions)
-            )
+        # entry.path is already joined by scandir, so no per-file os.path.join
+        task = (entry.path, entry.name, target_folders[ext], args.clone, args.verify)
+        if ext in PHOTO_EXTS:
+            photo_tasks.append(task)
+        else:
+            video_tasks.append(task)
+        exts_found.add(ext)
+    # Group the files by target folder (the sort is stable, so walk order is
+    # kept inside each group): the workers then write into one folder at a
+    # time instead of seeking between all of them.
+    photo_tasks.sort(key=lambda task: task[2])
+    video_tasks.sort(key=lambda task: task[2])
+    files_to_process = photo_tasks + video_tasks
 
     # Create main folders only if needed
-    photo_files = [f for f in files_to_process if os.path.splitext(f[1])[1].lower() in photo_extensions]
-    video_files = [f for f in files_to_process if os.path.splitext(f[1])[1].lower() in video_extensions]
-
-    if photo_files:
-        create_directory(photography_main)
-    if video_files:
+    if photo_tasks:
+        os.makedirs(photography_main, exist_ok=True)
+    if video_tasks:
         videography_folder = os.path.join(event_folder, "Videography")
-        create_directory(videography_folder)
-        create_directory(videography_main)
-        create_directory(os.path.join(videography_folder, "EXPORT"))
-        create_directory(os.path.join(videography_folder, "Project Files"))
-        create_directory(os.path.join(videography_folder, "VFX + SFX Folder"))
+        os.makedirs(videography_folder, exist_ok=True)
+        os.makedirs(videography_main, exist_ok=True)
+        os.makedirs(os.path.join(videography_folder, "EXPORT"), exist_ok=True)
+        os.makedirs(os.path.join(videography_folder, "Project Files"), exist_ok=True)
+        os.makedirs(os.path.join(videography_folder, "VFX + SFX Folder"), exist_ok=True)
+
+    # One folder per extension, created here once instead of by every worker
+    for ext in exts_found:
+        os.makedirs(target_folders[ext], exist_ok=True)
+
+    if not args.no_cache:
+        save_cache(source_folder, set(photo_file_paths))
 
     time.sleep(1)
     print(f"Found {len(files_to_process)} files to process.")
@@ -251,29 +1076,58 @@ def main():
     success_count = 0
     skipped_files = []
     time.sleep(1)
+    # Imported here so --processes workers, which re-import this module,
+    # don't pay for it
+    from tqdm import tqdm
     with tqdm(total=len(files_to_process), desc="Processing Files", unit="file") as pbar:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
-            future_to_file = {
-                executor.submit(process_file, task): task
-                for task in files_to_process
-            }
-            for future in concurrent.futures.as_completed(future_to_file):
-                try:
-                    success, file_name = future.result()
-                    if success:
-                        success_count += 1
-                    else:
+        # Copies spend their time in the kernel, so threads are usually enough;
+        # --processes avoids the GIL for the per-file Python work on fast disks.
+        if args.processes:
+            # Spawn, like native_pool: forking now would copy the tqdm monitor
+            # thread and the ExifTool reader threads and pipes into the workers
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=args.workers)
+        with executor:
+            # Keep only a few tasks per worker in flight instead of one Future
+            # per file, so memory stays flat however many files there are.
+            pending_tasks = iter(files_to_process)
+            future_to_file = {}
+            unreported = 0
+            last_update = time.monotonic()
+            for task in itertools.islice(pending_tasks, 4 * args.workers):
+                future_to_file[executor.submit(process_file, task)] = task[1]
+            while future_to_file:
+                done, _ = concurrent.futures.wait(
+                    future_to_file, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    file_name = future_to_file.pop(future)
+                    try:
+                        success, _ = future.result()
+                        if success:
+                            success_count += 1
+                        else:
+                            skipped_files.append(file_name)
+                    except Exception:
                         skipped_files.append(file_name)
-                except Exception:
-                    skipped_files.append(file_name)
-                pbar.update(1)
+                    for task in itertools.islice(pending_tasks, 1):
+                        future_to_file[executor.submit(process_file, task)] = task[1]
+                # Refresh the bar every 64 files or 0.1 s rather than per file
+                unreported += len(done)
+                if unreported >= 64 or time.monotonic() - last_update >= 0.1:
+                    pbar.update(unreported)
+                    unreported = 0
+                    last_update = time.monotonic()
+            pbar.update(unreported)
 
     print("\nTransfer Summary:")
     print(f"Successfully transferred {success_count} files, skipped {len(skipped_files)} files.")
     if skipped_files:
-        print("Skipped files:")
-        for file in skipped_files:
-            print(file)
+        # One write for the whole list; a console flushes on every print
+        print("Skipped files:\n" + "\n".join(skipped_files))
 
     print("\nTransfer complete. Press ENTER to exit...")
     input()